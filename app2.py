@@ -1,11 +1,14 @@
-import io
-import os
-from datetime import date, timedelta
+import logging
+import time
+from datetime import date
+from functools import lru_cache
 import pandas as pd
 import streamlit as st
-import plotly.express as px
 import httpx
 from sqlalchemy import create_engine, text
+from sqlalchemy.exc import DBAPIError
+
+log = logging.getLogger(__name__)
 
 # --- CONFIGURAÇÃO DA PÁGINA (Mobile Friendly) ---
 st.set_page_config(
@@ -30,16 +33,49 @@ except KeyError:
     st.stop()
 
 # Cache da conexão SQL
+# Pool pequeno e com pre-ping: o pooler do Supabase derruba conexões ociosas,
+# então testamos antes de usar e reciclamos antes do timeout.
 @st.cache_resource
 def get_engine():
-    return create_engine(DATABASE_URL)
+    engine = create_engine(
+        DATABASE_URL,
+        pool_pre_ping=True,
+        pool_size=2,
+        max_overflow=2,
+        pool_recycle=180,
+        connect_args={"sslmode": "require", "application_name": "streamlit_personal"},
+    )
+    ensure_indexes(engine)
+    return engine
+
+# Índices para as consultas "WHERE user_id = :uid ORDER BY data DESC LIMIT n"
+# e para a lista de alunos. Idempotente; roda uma vez por processo.
+# CONCURRENTLY não bloqueia escritas nas tabelas, mas não roda dentro de
+# transação: cada comando vai em autocommit, e a falha de um não desfaz os outros.
+INDEXES = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS treinos_user_data_desc ON treinos (user_id, data DESC)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS avaliacoes_user_data_desc ON avaliacoes (user_id, data DESC)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS profiles_role ON profiles (role) WHERE role = 'student'",
+]
+
+def ensure_indexes(engine):
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for ddl in INDEXES:
+            try:
+                conn.execute(text(ddl))
+            except DBAPIError as e:
+                # Ex.: usuário sem permissão de DDL. O app funciona sem o índice.
+                log.warning("Índice não criado (%s): %s", ddl, e.orig)
 
 # --- FUNÇÕES DE AUTH (Via API REST do Supabase) ---
+# Cliente HTTP único (HTTP/2 + keep-alive): reaproveita a sessão TLS entre chamadas
+@st.cache_resource
+def sb_client():
+    return httpx.Client(http2=True, base_url=SUPABASE_URL, headers={"apikey": SUPABASE_KEY}, timeout=10)
+
 def sb_login(email, password):
-    url = f"{SUPABASE_URL}/auth/v1/token?grant_type=password"
-    headers = {"apikey": SUPABASE_KEY, "Content-Type": "application/json"}
     try:
-        resp = httpx.post(url, headers=headers, json={"email": email, "password": password}, timeout=10)
+        resp = sb_client().post("/auth/v1/token", params={"grant_type": "password"}, json={"email": email, "password": password})
         resp.raise_for_status()
         return resp.json()
     except httpx.HTTPStatusError as e:
@@ -55,30 +91,228 @@ def sb_login(email, password):
         st.error(f"Erro de conexão: {e}")
         return None
 
+# Perfil (role, nome) cacheado por user_id; o token muda a cada login,
+# por isso fica fora da chave do cache (prefixo "_").
+@st.cache_data(ttl=300, show_spinner=False)
+def _profile(user_id, _token):
+    params = {"user_id": f"eq.{user_id}", "select": "*"}
+    headers = {"Authorization": f"Bearer {_token}"}
+    resp = sb_client().get("/rest/v1/profiles", params=params, headers=headers)
+    resp.raise_for_status()
+    return resp.json()
+
 def get_user_profile(user_id, token):
     # Busca role e nome na tabela profiles
-    url = f"{SUPABASE_URL}/rest/v1/profiles?user_id=eq.{user_id}&select=*"
-    headers = {"apikey": SUPABASE_KEY, "Authorization": f"Bearer {token}"}
-    try:
-        resp = httpx.get(url, headers=headers)
-        data = resp.json()
-        if data:
-            return data[0]
-        # Se não tiver perfil, cria um padrão 'student'
-        return {"role": "student", "nome": "Aluno", "user_id": user_id}
-    except:
-        return {"role": "student", "nome": "Aluno", "user_id": user_id}
+    # Se não tiver perfil, cria um padrão 'student'
+    padrao = {"role": "student", "nome": "Aluno", "user_id": user_id}
+    # Falha transitória (rede, 5xx, JSON inválido) ganha uma nova tentativa
+    # antes de cair no padrão, que rebaixaria um professor para aluno
+    for tentativa in range(2):
+        try:
+            data = _profile(user_id, token)
+            return data[0] if data else padrao
+        except httpx.HTTPStatusError as e:
+            # 4xx (token expirado, RLS) não muda com nova tentativa
+            if e.response.status_code < 500:
+                return padrao
+        except (httpx.TransportError, ValueError):
+            pass
+        except httpx.HTTPError:
+            return padrao
+        if tentativa == 0:
+            time.sleep(0.1)
+    return padrao
+
+# --- SQL ---
+# Consultas em constantes de módulo; sql_text() cria o TextClause de cada uma
+# uma única vez (a compilação fica com o cache do próprio SQLAlchemy)
+SQL_ALUNOS = "SELECT * FROM profiles WHERE role = 'student'"
+
+# Orçamento de pontos do gráfico (~2x a largura útil no celular). A série
+# busca até 4x esse volume e o M4 (downsample_m4) reduz ao orçamento.
+PLOT_MAX_PONTOS = 800
+AV_SERIE_LIMIT = 4 * PLOT_MAX_PONTOS
+
+# Dashboard numa única ida ao banco: métricas da última avaliação (m) e a
+# série do gráfico (av, em JSON). Sempre devolve uma linha; sem avaliações,
+# as colunas de m vêm NULL.
+# Deltas só sobre as duas últimas avaliações (usa o índice user_id, data DESC).
+# As linhas são numeradas uma vez (rn) para que datas repetidas não troquem a
+# "última" pela "anterior"; n é 1 ou 2 e indica se existe avaliação anterior.
+SQL_PAINEL = """
+    WITH ult AS (
+        SELECT data, peso, percentual_gordura, percentual_massa_magra,
+               ROW_NUMBER() OVER (ORDER BY data DESC) AS rn
+        FROM avaliacoes WHERE user_id = :uid
+        ORDER BY rn LIMIT 2
+    ), d AS (
+        SELECT rn, peso, peso - LEAD(peso) OVER w AS d_peso,
+               percentual_gordura, percentual_gordura - LEAD(percentual_gordura) OVER w AS d_gord,
+               percentual_massa_magra, percentual_massa_magra - LEAD(percentual_massa_magra) OVER w AS d_mm,
+               COUNT(*) OVER () AS n
+        FROM ult
+        WINDOW w AS (ORDER BY rn)
+    ), m AS (
+        SELECT * FROM d WHERE rn = 1
+    ), av AS (
+        SELECT data, peso, percentual_gordura
+        FROM avaliacoes WHERE user_id = :uid
+        ORDER BY data DESC LIMIT :n_av
+    )
+    SELECT m.peso, m.d_peso, m.percentual_gordura, m.d_gord,
+           m.percentual_massa_magra, m.d_mm, m.n,
+           (SELECT json_agg(av ORDER BY av.data DESC) FROM av) AS av
+    FROM (SELECT 1) AS um LEFT JOIN m ON TRUE
+"""
+
+SQL_TREINOS = """
+    SELECT data, grupo_muscular, exercicio, series, repeticoes, carga_kg
+    FROM treinos
+    WHERE user_id = :uid
+    ORDER BY data DESC LIMIT 20
+"""
+
+SQL_HIST_AV = """
+    SELECT data, peso, altura, percentual_gordura, percentual_massa_magra
+    FROM avaliacoes
+    WHERE user_id = :uid
+    ORDER BY data DESC LIMIT :n OFFSET :o
+"""
+
+SQL_INSERT_TREINO = """
+    INSERT INTO treinos (user_id, data, grupo_muscular, exercicio, series, repeticoes, carga_kg, observacoes)
+    VALUES (:uid, :dt, :grp, :exc, :ser, :rep, :kg, :obs)
+"""
+
+SQL_INSERT_AV = """
+    INSERT INTO avaliacoes (user_id, data, peso, altura, percentual_gordura, percentual_massa_magra)
+    VALUES (:uid, :dt, :p, :a, :g, :m)
+"""
+
+# text() analisa os bind params a cada chamada; memoiza o TextClause por SQL.
+# O SQLAlchemy reaproveita a compilação via o cache interno do engine.
+@lru_cache(maxsize=None)
+def sql_text(sql):
+    return text(sql)
 
 # --- FUNÇÕES DE DADOS (SQL) ---
-def run_query(query, params=None):
+# Medidas corporais/cargas não precisam de float64: float32 corta memória
+# e o volume serializado para o navegador pela metade
+FLOAT32_COLS = ["peso", "altura", "percentual_gordura", "percentual_massa_magra", "carga_kg"]
+
+def narrow_dtypes(df):
+    cols = {c: "float32" for c in FLOAT32_COLS if c in df.columns}
+    # Datas já em datetime (série do gráfico) caem para resolução de segundos.
+    # Colunas DATE lidas como objetos date (tabelas) ficam assim para não
+    # aparecerem com "00:00:00" no st.dataframe.
+    if "data" in df.columns and pd.api.types.is_datetime64_any_dtype(df["data"]):
+        cols["data"] = "datetime64[s]"
+    return df.astype(cols) if cols else df
+
+# Cache das leituras: evita ida ao banco a cada rerun (troca de aba, widgets).
+# A chave é o texto da query + params + versão dos dados do aluno (ver
+# painel_versions); inserts incrementam a versão em vez de limpar o cache.
+@st.cache_data(ttl=60, show_spinner=False)
+def run_query(query, params=None, ver=0):
+    engine = get_engine()
+    with engine.connect() as conn:
+        return narrow_dtypes(pd.read_sql(sql_text(query), conn, params=params))
+
+# Lista de alunos muda raramente: cache mais longo
+@st.cache_data(ttl=300, show_spinner=False)
+def load_alunos():
     engine = get_engine()
     with engine.connect() as conn:
-        return pd.read_sql(text(query), conn, params=params)
+        return pd.read_sql(sql_text(SQL_ALUNOS), conn)
 
 def execute_statement(statement, params=None):
     engine = get_engine()
     with engine.begin() as conn:
-        conn.execute(text(statement), params)
+        conn.execute(sql_text(statement), params)
+
+# Lista de dicts -> um único executemany na mesma transação (1 round-trip)
+def execute_many(statement, rows):
+    engine = get_engine()
+    with engine.begin() as conn:
+        conn.execute(sql_text(statement), rows)
+
+# Dados do dashboard (métricas + série do gráfico) numa única ida ao banco:
+# cada consulta separada pagaria um round-trip inteiro até o Supabase.
+# As métricas voltam como tupla simples, sem passar pelo pandas.
+# `ver` só entra na chave do cache: cada insert incrementa a versão do aluno
+# (ver painel_versions), então há exatamente uma nova leitura por mutação.
+@st.cache_data(ttl=60, show_spinner=False)
+def load_painel(uid, ver=0):
+    engine = get_engine()
+    with engine.connect() as conn:
+        row = conn.execute(sql_text(SQL_PAINEL), {"uid": uid, "n_av": AV_SERIE_LIMIT}).one()
+    metricas = tuple(row[:7]) if row.n is not None else None
+    # json_agg devolve NULL quando não há linhas; datas chegam como texto
+    df_av = pd.DataFrame(row.av or [])
+    if not df_av.empty:
+        df_av["data"] = pd.to_datetime(df_av["data"])
+    return metricas, narrow_dtypes(df_av)
+
+# Treinos recentes: consulta própria, a aba não paga pela série do gráfico
+@st.cache_data(ttl=60, show_spinner=False)
+def load_treinos(uid, ver=0):
+    engine = get_engine()
+    with engine.connect() as conn:
+        return narrow_dtypes(pd.read_sql(sql_text(SQL_TREINOS), conn, params={"uid": uid}))
+
+# Versão dos dados por aluno. Fica no processo (cache_resource), no mesmo
+# escopo dos caches de run_query/load_painel/load_treinos: todas as sessões
+# enxergam o incremento.
+@st.cache_resource
+def painel_versions():
+    return {}
+
+# Chamado após inserts: só as leituras daquele aluno passam a uma chave nova,
+# os caches dos demais alunos continuam válidos
+def bump_data_version(uid):
+    versions = painel_versions()
+    versions[uid] = versions.get(uid, 0) + 1
+
+# --- MÉTRICAS DO DASHBOARD ---
+def safe_delta(d):
+    if d is None: return None
+    return f"{float(d):.1f}"
+
+def metrics_from_row(row):
+    # Linha (peso, d_peso, gordura, d_gordura, massa magra, d_mm, n) de SQL_PAINEL
+    peso, d_peso, gord, d_gord, mm, d_mm, n = row
+    peso, gord, mm = (float(v) if v is not None else 0.0 for v in (peso, gord, mm))
+    return peso, gord, mm, safe_delta(d_peso), safe_delta(d_gord), safe_delta(d_mm), n
+
+# --- FUNÇÕES DE GRÁFICO ---
+def downsample_m4(df, x, ys, max_points=PLOT_MAX_PONTOS):
+    # M4: divide o eixo x em buckets de mesma largura (uma "coluna de pixels"
+    # cada) e mantém, em cada um, o primeiro, o último, o mínimo e o máximo de
+    # cada coluna. Preserva o formato visual da linha.
+    if len(df) <= max_points:
+        return df
+    df = df.sort_values(x).reset_index(drop=True)
+    n_buckets = max(1, max_points // (2 + 2 * len(ys)))
+    # Buckets no tempo, não por posição: as pesagens não são regulares
+    bucket = pd.cut(df[x].astype("int64"), n_buckets, labels=False)
+    grupos = df.groupby(bucket)
+    keep = set(grupos.head(1).index) | set(grupos.tail(1).index)
+    for col in ys:
+        serie = df[col].dropna()
+        g = serie.groupby(bucket)
+        keep.update(g.idxmin())
+        keep.update(g.idxmax())
+    return df.loc[sorted(keep)]
+
+# Figura cacheada pelo conteúdo do DataFrame: mesmos dados, mesmo dict, sem
+# reconstruir no Python. Dados novos (após insert) geram outra chave.
+@st.cache_data(max_entries=50, show_spinner=False)
+def build_evolucao_fig(df_av):
+    import plotly.express as px  # import tardio: só quem abre o gráfico paga o custo
+    df_plot = downsample_m4(df_av, "data", ["peso", "percentual_gordura"])
+    fig = px.line(df_plot, x="data", y=["peso", "percentual_gordura"], markers=True, title="Evolução Corporal", render_mode="webgl")
+    fig.update_layout(legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
+    return fig.to_dict()
 
 # --- UI: TELA DE LOGIN ---
 if "auth" not in st.session_state:
@@ -124,6 +358,7 @@ c1, c2 = st.columns([3, 1])
 c1.subheader(f"Olá, {user['nome']}")
 if c2.button("Sair"):
     st.session_state.auth = None
+    _profile.clear()
     st.rerun()
 
 # --- SELEÇÃO DE ALUNO (Apenas Professor) ---
@@ -134,9 +369,9 @@ if is_teacher:
     with st.expander("👥 Selecionar Aluno (Visão do Professor)", expanded=False):
         # Busca todos os alunos
         try:
-            alunos_df = run_query("SELECT * FROM profiles WHERE role = 'student'")
+            alunos_df = load_alunos()
             if not alunos_df.empty:
-                aluno_opts = {row["nome"]: row["user_id"] for i, row in alunos_df.iterrows()}
+                aluno_opts = dict(zip(alunos_df["nome"].to_numpy(), alunos_df["user_id"].to_numpy()))
                 sel_aluno = st.selectbox("Visualizar dados de:", ["(Eu mesmo)"] + list(aluno_opts.keys()))
                 
                 if sel_aluno != "(Eu mesmo)":
@@ -147,52 +382,39 @@ if is_teacher:
         except Exception as e:
             st.error(f"Erro ao buscar alunos: {e}")
 
+# Versão dos dados (avaliações + treinos) do aluno visualizado
+painel_ver = painel_versions().get(target_user_id, 0)
+
 # --- ABAS DE NAVEGAÇÃO (Melhor para celular) ---
-tab_dash, tab_treino, tab_aval, tab_conta = st.tabs(["📊 Dash", "💪 Treinos", "📏 Avaliação", "⚙️ Conta"])
+# st.tabs executa o corpo de todas as abas a cada rerun (e as consultas junto);
+# com o radio só a aba visível roda.
+TAB_DASH, TAB_TREINO, TAB_AVAL, TAB_CONTA = "📊 Dash", "💪 Treinos", "📏 Avaliação", "⚙️ Conta"
+aba = st.radio("Navegação", [TAB_DASH, TAB_TREINO, TAB_AVAL, TAB_CONTA], horizontal=True, label_visibility="collapsed", key="aba")
 
 # =========================================================
 # TAB 1: DASHBOARD
 # =========================================================
-with tab_dash:
+if aba == TAB_DASH:
     st.caption(f"Visualizando dados de: **{target_user_name}**")
     
     try:
-        # Busca última avaliação
-        df_av = run_query("""
-            SELECT * FROM avaliacoes 
-            WHERE user_id = :uid 
-            ORDER BY data DESC
-        """, {"uid": target_user_id})
-
-        if not df_av.empty:
-            last = df_av.iloc[0]
-            prev = df_av.iloc[1] if len(df_av) > 1 else None
+        # Última avaliação (deltas já calculados no banco com LEAD) + série do gráfico
+        metricas, df_av = load_painel(target_user_id, painel_ver)
+
+        if metricas:
+            peso_val, gord_val, mm_val, d_peso, d_gord, d_mm, n_av = metrics_from_row(metricas)
             
             # Métricas (Cards)
             k1, k2, k3 = st.columns(3)
-            
-            def safe_delta(curr, prev_val):
-                if prev_val is None or pd.isna(prev_val): return None
-                return f"{curr - prev_val:.1f}"
-
-            peso_val = float(last['peso']) if pd.notna(last['peso']) else 0.0
-            gord_val = float(last['percentual_gordura']) if pd.notna(last['percentual_gordura']) else 0.0
-            mm_val = float(last['percentual_massa_magra']) if pd.notna(last['percentual_massa_magra']) else 0.0
-
-            peso_prev = float(prev['peso']) if prev is not None and pd.notna(prev['peso']) else None
-            gord_prev = float(prev['percentual_gordura']) if prev is not None and pd.notna(prev['percentual_gordura']) else None
-            mm_prev = float(prev['percentual_massa_magra']) if prev is not None and pd.notna(prev['percentual_massa_magra']) else None
 
-            k1.metric("Peso", f"{peso_val} kg", safe_delta(peso_val, peso_prev))
-            k2.metric("% Gordura", f"{gord_val}%", safe_delta(gord_val, gord_prev), delta_color="inverse")
-            k3.metric("Massa Magra", f"{mm_val}%", safe_delta(mm_val, mm_prev))
+            k1.metric("Peso", f"{peso_val} kg", d_peso)
+            k2.metric("% Gordura", f"{gord_val}%", d_gord, delta_color="inverse")
+            k3.metric("Massa Magra", f"{mm_val}%", d_mm)
 
             # Gráficos (Plotly Mobile Friendly)
             st.divider()
-            if len(df_av) > 1:
-                fig = px.line(df_av, x="data", y=["peso", "percentual_gordura"], markers=True, title="Evolução Corporal")
-                fig.update_layout(legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1))
-                st.plotly_chart(fig, use_container_width=True)
+            if n_av > 1:
+                st.plotly_chart(build_evolucao_fig(df_av), use_container_width=True)
             else:
                 st.info("Registre mais avaliações para ver o gráfico de evolução.")
         else:
@@ -203,7 +425,7 @@ with tab_dash:
 # =========================================================
 # TAB 2: TREINOS
 # =========================================================
-with tab_treino:
+if aba == TAB_TREINO:
     st.caption(f"Histórico de: **{target_user_name}**")
     
     # Botão de Novo Treino
@@ -211,41 +433,69 @@ with tab_treino:
         with st.form("form_treino"):
             d_treino = st.date_input("Data", value=date.today())
             grupo = st.selectbox("Grupo", ["Peito", "Costas", "Pernas", "Ombros", "Bíceps", "Tríceps", "Abdômen", "Cardio"])
-            exercicio = st.text_input("Exercício (ex: Supino)")
             
-            c_s, c_r, c_k = st.columns(3)
-            series = c_s.number_input("Séries", 1, 10, 3)
-            reps = c_r.number_input("Reps", 1, 50, 10)
-            carga = c_k.number_input("Carga (kg)", 0.0, 500.0, 0.0)
-            
-            obs = st.text_area("Obs")
+            # Uma linha por exercício: vários lançamentos num único envio
+            st.caption("Adicione uma linha para cada exercício.")
+            df_exerc = st.data_editor(
+                pd.DataFrame([{"exercicio": "", "series": 3, "repeticoes": 10, "carga_kg": 0.0, "observacoes": ""}]),
+                num_rows="dynamic",
+                use_container_width=True,
+                hide_index=True,
+                key="treino_editor",
+                column_config={
+                    "exercicio": st.column_config.TextColumn("Exercício (ex: Supino)"),
+                    "series": st.column_config.NumberColumn("Séries", min_value=1, max_value=10, step=1),
+                    "repeticoes": st.column_config.NumberColumn("Reps", min_value=1, max_value=50, step=1),
+                    "carga_kg": st.column_config.NumberColumn("Carga (kg)", min_value=0.0, max_value=500.0),
+                    "observacoes": st.column_config.TextColumn("Obs"),
+                },
+            )
             
             if st.form_submit_button("Salvar Treino", use_container_width=True):
-                try:
-                    execute_statement("""
-                        INSERT INTO treinos (user_id, data, grupo_muscular, exercicio, series, repeticoes, carga_kg, observacoes)
-                        VALUES (:uid, :dt, :grp, :exc, :ser, :rep, :kg, :obs)
-                    """, {
-                        "uid": target_user_id, "dt": d_treino, "grp": grupo, "exc": exercicio,
-                        "ser": series, "rep": reps, "kg": carga, "obs": obs
-                    })
-                    st.success("Treino salvo!")
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Erro ao salvar: {e}")
+                df_exerc = df_exerc.fillna({"exercicio": "", "series": 3, "repeticoes": 10, "carga_kg": 0.0, "observacoes": ""})
+                rows = [
+                    {
+                        "uid": target_user_id, "dt": d_treino, "grp": grupo, "exc": r["exercicio"].strip(),
+                        "ser": int(r["series"]), "rep": int(r["repeticoes"]), "kg": float(r["carga_kg"]), "obs": r["observacoes"]
+                    }
+                    for r in df_exerc.to_dict("records") if r["exercicio"].strip()
+                ]
+                if not rows:
+                    st.warning("Informe ao menos um exercício.")
+                else:
+                    try:
+                        execute_many(SQL_INSERT_TREINO, rows)
+                        bump_data_version(target_user_id)
+                        st.success("Treino salvo!")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Erro ao salvar: {e}")
 
     # Lista de Treinos Recentes
     st.subheader("Últimos Treinos")
     try:
-        df_treinos = run_query("""
-            SELECT data, grupo_muscular, exercicio, series, repeticoes, carga_kg 
-            FROM treinos 
-            WHERE user_id = :uid 
-            ORDER BY data DESC LIMIT 20
-        """, {"uid": target_user_id})
+        df_treinos = load_treinos(target_user_id, painel_ver)
         
         if not df_treinos.empty:
-            st.dataframe(df_treinos, use_container_width=True, hide_index=True)
+            # Paginação local: só uma página de linhas vai para o navegador
+            TR_PAGE = 10
+            n_pag = -(-len(df_treinos) // TR_PAGE)
+            # Ao trocar de aluno a página volta para a primeira
+            if st.session_state.get("tr_page_uid") != target_user_id:
+                st.session_state.tr_page = 0
+                st.session_state.tr_page_uid = target_user_id
+            pag = min(st.session_state.setdefault("tr_page", 0), n_pag - 1)
+            st.dataframe(df_treinos.iloc[pag * TR_PAGE:(pag + 1) * TR_PAGE], use_container_width=True, hide_index=True)
+            
+            if n_pag > 1:
+                cp, ci, cn = st.columns([1, 2, 1])
+                if cp.button("◀", key="tr_prev", disabled=pag == 0, use_container_width=True):
+                    st.session_state.tr_page = pag - 1
+                    st.rerun()
+                ci.caption(f"Página {pag + 1} de {n_pag}")
+                if cn.button("▶", key="tr_next", disabled=pag >= n_pag - 1, use_container_width=True):
+                    st.session_state.tr_page = pag + 1
+                    st.rerun()
         else:
             st.write("Sem histórico.")
     except Exception as e:
@@ -254,7 +504,7 @@ with tab_treino:
 # =========================================================
 # TAB 3: AVALIAÇÃO FÍSICA
 # =========================================================
-with tab_aval:
+if aba == TAB_AVAL:
     if is_teacher:
         with st.expander("➕ Nova Avaliação Física"):
             with st.form("form_aval"):
@@ -267,10 +517,8 @@ with tab_aval:
                 
                 if st.form_submit_button("Salvar Avaliação"):
                     try:
-                        execute_statement("""
-                            INSERT INTO avaliacoes (user_id, data, peso, altura, percentual_gordura, percentual_massa_magra)
-                            VALUES (:uid, :dt, :p, :a, :g, :m)
-                        """, {"uid": target_user_id, "dt": dt_av, "p": peso_av, "a": alt_av, "g": gord_av, "m": mm_av})
+                        execute_statement(SQL_INSERT_AV, {"uid": target_user_id, "dt": dt_av, "p": peso_av, "a": alt_av, "g": gord_av, "m": mm_av})
+                        bump_data_version(target_user_id)
                         st.success("Avaliação salva!")
                         st.rerun()
                     except Exception as e:
@@ -280,15 +528,28 @@ with tab_aval:
     
     # Tabela detalhada
     st.subheader("Histórico Completo")
-    if 'df_av' in locals() and not df_av.empty:
-        st.dataframe(df_av, use_container_width=True, hide_index=True)
-    else:
-        st.write("Nenhuma avaliação.")
+    AV_PAGE = 20
+    # Ao trocar de aluno a página volta para a primeira
+    if st.session_state.get("av_pagina_uid") != target_user_id:
+        st.session_state.av_pagina = 1
+        st.session_state.av_pagina_uid = target_user_id
+    pagina = st.number_input("Página", min_value=1, step=1, key="av_pagina")
+    try:
+        df_hist = run_query(SQL_HIST_AV, {"uid": target_user_id, "n": AV_PAGE, "o": (pagina - 1) * AV_PAGE}, painel_ver)
+
+        if not df_hist.empty:
+            st.dataframe(df_hist, use_container_width=True, hide_index=True)
+        elif pagina > 1:
+            st.write("Página vazia: não há avaliações além da página anterior.")
+        else:
+            st.write("Nenhuma avaliação.")
+    except Exception as e:
+        st.error(f"Erro ao carregar avaliações: {e}")
 
 # =========================================================
 # TAB 4: CONTA E CONFIG
 # =========================================================
-with tab_conta:
+if aba == TAB_CONTA:
     st.markdown("### Configurações")
     if is_teacher:
         st.success("Logado como: **Professor**")
@@ -304,4 +565,5 @@ with tab_conta:
     st.markdown("---")
     if st.button("Sair (Logout)"):
         st.session_state.auth = None
+        _profile.clear()
         st.rerun()
\ No newline at end of file